@@ -19,22 +19,31 @@ os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'smart_water_meter.settings')
 django.setup()
 
 from django.contrib.auth.models import User
-from water_meter.models import Device
-import secrets
-import string
+from water_meter.models import Device, generate_api_key
 
-def generate_api_key():
-    """Generate a secure API key for device authentication"""
-    alphabet = string.ascii_letters + string.digits
-    return ''.join(secrets.choice(alphabet) for _ in range(32))
+# Precompiled once so batch provisioning emits each snippet as a single write
+_ARDUINO_TMPL = """
+🔧 Arduino Configuration:
+Copy these lines to your Arduino code:
+----------------------------------------
+const char* deviceID = "{device_id}";
+const char* apiKey = "{api_key}";
+const char* serverURL = "http://YOUR_SERVER_IP:8000/api/data/";
+----------------------------------------
+⚠️  Don't forget to update YOUR_SERVER_IP with your actual server IP!
+"""
 
 def setup_device(device_id, name, location, owner_username='admin'):
-    """Set up a new IoT device in the database"""
-    
+    """Set up a new IoT device in the database.
+
+    Returns (device, api_key); the raw key is only available here at
+    provisioning time since the database stores just its hash.
+    """
+
     try:
         # Get the owner user
         owner = User.objects.get(username=owner_username)
-        
+
         # Check if device already exists
         device, created = Device.objects.get_or_create(
             device_id=device_id,
@@ -43,76 +52,83 @@ def setup_device(device_id, name, location, owner_username='admin'):
                 'location': location,
                 'owner': owner,
                 'is_active': True,
-                'api_key': generate_api_key(),
                 'pulse_rate': 450.0  # YF-S201 default
             }
         )
-        
+
+        api_key = None
         if created:
             print(f"✅ Device created successfully!")
+            api_key = generate_api_key()
+            device.set_api_key(api_key)
+            device.save(update_fields=['api_key_hash'])
         else:
             print(f"ℹ️  Device already exists, updating details...")
             device.name = name
             device.location = location
             device.is_active = True
-            if not device.api_key:
-                device.api_key = generate_api_key()
+            if not device.api_key_hash:
+                api_key = generate_api_key()
+                device.set_api_key(api_key)
             device.save()
-        
+
         print(f"📱 Device ID: {device.device_id}")
         print(f"📍 Name: {device.name}")
         print(f"🏠 Location: {device.location}")
         print(f"👤 Owner: {device.owner.username}")
-        print(f"🔑 API Key: {device.api_key}")
+        if api_key:
+            print(f"🔑 API Key: {api_key} (save it now - only its hash is stored)")
+        else:
+            print(f"🔑 API Key: unchanged (only its hash is stored)")
         print(f"⚡ Status: {'Active' if device.is_active else 'Inactive'}")
-        
-        return device
-        
+
+        return device, api_key
+
     except User.DoesNotExist:
         print(f"❌ Error: User '{owner_username}' not found")
         print("   Please create a user first or use existing username")
-        return None
+        return None, None
     except Exception as e:
         print(f"❌ Error setting up device: {str(e)}")
-        return None
+        return None, None
 
 def list_devices():
     """List all devices in the system"""
-    devices = Device.objects.all().select_related('owner')
-    
-    if not devices:
-        print("📱 No devices found in the system")
-        return
-    
-    print(f"📱 Found {devices.count()} device(s):")
-    print("-" * 80)
-    
-    for device in devices:
-        status = "🟢 Active" if device.is_active else "🔴 Inactive"
-        last_seen = device.last_seen.strftime("%Y-%m-%d %H:%M:%S") if device.last_seen else "Never"
-        
-        print(f"ID: {device.device_id}")
-        print(f"Name: {device.name}")
-        print(f"Location: {device.location}")
-        print(f"Owner: {device.owner.username}")
+    rows = Device.objects.values_list(
+        'device_id', 'name', 'location', 'owner__username',
+        'is_active', 'last_seen'
+    ).iterator(chunk_size=1000)
+
+    count = 0
+    for device_id, name, location, owner_username, is_active, last_seen in rows:
+        if count == 0:
+            print("📱 Listing devices:")
+            print("-" * 80)
+        count += 1
+        status = "🟢 Active" if is_active else "🔴 Inactive"
+        last_seen = last_seen.strftime("%Y-%m-%d %H:%M:%S") if last_seen else "Never"
+
+        print(f"ID: {device_id}")
+        print(f"Name: {name}")
+        print(f"Location: {location}")
+        print(f"Owner: {owner_username}")
         print(f"Status: {status}")
         print(f"Last Seen: {last_seen}")
-        print(f"API Key: {device.api_key}")
         print("-" * 40)
 
-def update_arduino_config(device):
+    if count:
+        print(f"📱 Found {count} device(s)")
+    else:
+        print("📱 No devices found in the system")
+
+def update_arduino_config(device, api_key):
     """Generate Arduino configuration snippet"""
-    if not device:
+    if not device or not api_key:
         return
-    
-    print("\n🔧 Arduino Configuration:")
-    print("Copy these lines to your Arduino code:")
-    print("-" * 40)
-    print(f'const char* deviceID = "{device.device_id}";')
-    print(f'const char* apiKey = "{device.api_key}";')
-    print('const char* serverURL = "http://YOUR_SERVER_IP:8000/api/data/";')
-    print("-" * 40)
-    print("⚠️  Don't forget to update YOUR_SERVER_IP with your actual server IP!")
+
+    sys.stdout.write(_ARDUINO_TMPL.format(
+        device_id=device.device_id, api_key=api_key
+    ))
 
 def main():
     print("🚀 Smart Water Meter Device Setup")
@@ -135,9 +151,9 @@ def main():
             owner = input("Owner username (default: admin): ").strip() or 'admin'
             
             if device_id and name and location:
-                device = setup_device(device_id, name, location, owner)
+                device, api_key = setup_device(device_id, name, location, owner)
                 if device:
-                    update_arduino_config(device)
+                    update_arduino_config(device, api_key)
             else:
                 print("❌ Please provide all required information")
         
@@ -149,7 +165,13 @@ def main():
             device_id = input("Enter Device ID: ").strip()
             try:
                 device = Device.objects.get(device_id=device_id)
-                update_arduino_config(device)
+                # Only the hash is stored, so emitting a config means
+                # rotating the device's key
+                print("🔄 Rotating API key (the stored hash cannot be reversed)...")
+                api_key = generate_api_key()
+                device.set_api_key(api_key)
+                device.save(update_fields=['api_key_hash'])
+                update_arduino_config(device, api_key)
             except Device.DoesNotExist:
                 print(f"❌ Device '{device_id}' not found")
         
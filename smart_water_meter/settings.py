@@ -85,6 +85,9 @@ DATABASES = {
     'default': {
         'ENGINE': 'django.db.backends.sqlite3',
         'NAME': BASE_DIR / 'db.sqlite3',
+        # Reuse connections across requests instead of reconnecting per
+        # request; pairs with transaction-mode pooling (PgBouncer) in prod
+        'CONN_MAX_AGE': config('CONN_MAX_AGE', default=60, cast=int),
     }
 }
 
@@ -165,11 +168,50 @@ EMAIL_USE_TLS = config('EMAIL_USE_TLS', default=True, cast=bool)
 EMAIL_HOST_USER = config('EMAIL_HOST_USER', default='')
 EMAIL_HOST_PASSWORD = config('EMAIL_HOST_PASSWORD', default='')
 
+# Cache
+# Shared across processes on the same Redis instance as Celery: the
+# dashboard payloads, cached page HTML and open-alert flags are
+# invalidated from web workers and Celery workers alike, which the
+# per-process locmem default would silently break. Dev setups without
+# Redis can point CACHE_BACKEND at locmem (single-process, so the
+# cross-process caveat doesn't apply)
+CACHES = {
+    'default': {
+        'BACKEND': config('CACHE_BACKEND',
+                          default='django.core.cache.backends.redis.RedisCache'),
+        'LOCATION': config('REDIS_URL', default='redis://localhost:6379/0'),
+    }
+}
+
 # Celery Configuration
 CELERY_BROKER_URL = config('REDIS_URL', default='redis://localhost:6379/0')
 CELERY_RESULT_BACKEND = config('REDIS_URL', default='redis://localhost:6379/0')
+# Run tasks inline in development (no broker/worker needed); production
+# sets CELERY_TASK_ALWAYS_EAGER=False to dispatch to real workers
+CELERY_TASK_ALWAYS_EAGER = config('CELERY_TASK_ALWAYS_EAGER', default=DEBUG, cast=bool)
+
+CELERY_BEAT_SCHEDULE = {
+    # No-op outside Postgres; see water_meter.tasks.refresh_daily_rollup
+    'refresh-daily-rollup': {
+        'task': 'water_meter.tasks.refresh_daily_rollup',
+        'schedule': 300.0,
+    },
+}
+
+# Opt-in ingest write buffer: readings are parked in Redis and flushed
+# every second as bulk INSERTs. Off by default so small deployments keep
+# the simple INSERT-per-POST path (and need no beat process)
+INGEST_BUFFER_ENABLED = config('INGEST_BUFFER_ENABLED', default=False, cast=bool)
+if INGEST_BUFFER_ENABLED:
+    CELERY_BEAT_SCHEDULE['flush-ingest-buffer'] = {
+        'task': 'water_meter.tasks.flush_ingest_buffer',
+        'schedule': 1.0,
+    }
 
 # Water Meter Settings
+# Pepper for HMAC-hashing device API keys; rotate only together with a
+# re-provisioning of all device keys
+API_KEY_PEPPER = config('API_KEY_PEPPER', default=SECRET_KEY)
 WATER_RATE_PER_LITER = config('WATER_RATE_PER_LITER', default=0.002, cast=float)
 LEAK_THRESHOLD_LITERS_PER_HOUR = config('LEAK_THRESHOLD_LITERS_PER_HOUR', default=50, cast=int)
 EXCESSIVE_USAGE_THRESHOLD_LITERS_PER_DAY = config('EXCESSIVE_USAGE_THRESHOLD_LITERS_PER_DAY', default=500, cast=int)
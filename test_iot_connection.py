@@ -8,24 +8,48 @@ the API endpoint and database persistence.
 
 import requests
 import json
+import logging
+import os
 import time
 import random
+import numpy as np
 from datetime import datetime, timezone
 
+# Run with LOGLEVEL=DEBUG to see full payloads and response headers;
+# at INFO the expensive json.dumps formatting is skipped entirely
+logging.basicConfig(level=os.environ.get('LOGLEVEL', 'INFO'), format='%(message)s')
+logger = logging.getLogger('iot_test')
+
 # Configuration
 SERVER_URL = "http://127.0.0.1:8000/api/data/"
 DEVICE_ID = "DEVICE_001"
 API_KEY = "your-device-api-key-here"  # Replace with actual API key
 
+# Shared session: keep-alive reuses one TCP connection across all requests
+# instead of paying a fresh handshake per POST
+session = requests.Session()
+session.headers.update({
+    'Content-Type': 'application/json',
+    'X-API-Key': API_KEY,
+    'User-Agent': 'IoT-Test-Script/1.0'
+})
+session.mount('http://', requests.adapters.HTTPAdapter(pool_connections=4, pool_maxsize=16))
+
+def batch_timestamps(count, step_ns=10**9):
+    """Build ISO timestamps from one clock sample plus fixed offsets.
+
+    Sampling the clock once and adding integer nanosecond deltas avoids a
+    syscall per reading and keeps batch timestamps evenly spaced.
+    """
+    base_ns = time.time_ns()
+    return [
+        datetime.fromtimestamp((base_ns + i * step_ns) / 1e9, tz=timezone.utc).isoformat()
+        for i in range(count)
+    ]
+
 def test_iot_connection():
     """Test IoT device connection and data submission"""
-    
-    headers = {
-        'Content-Type': 'application/json',
-        'X-API-Key': API_KEY,
-        'User-Agent': 'IoT-Test-Script/1.0'
-    }
-    
+
     # Generate sample water usage data
     test_data = {
         'device_id': DEVICE_ID,
@@ -35,107 +59,107 @@ def test_iot_connection():
         'timestamp': datetime.now(timezone.utc).isoformat()
     }
     
-    print("🔄 Testing IoT Connection...")
-    print(f"📡 Server URL: {SERVER_URL}")
-    print(f"🔑 Device ID: {DEVICE_ID}")
-    print(f"📊 Test Data: {json.dumps(test_data, indent=2)}")
-    print("-" * 50)
+    logger.info("🔄 Testing IoT Connection...")
+    logger.info(f"📡 Server URL: {SERVER_URL}")
+    logger.info(f"🔑 Device ID: {DEVICE_ID}")
+    if logger.isEnabledFor(logging.DEBUG):
+        logger.debug("📊 Test Data: %s", json.dumps(test_data, indent=2))
+    logger.info("-" * 50)
     
     try:
         # Send POST request
-        response = requests.post(
+        response = session.post(
             SERVER_URL,
-            headers=headers,
             json=test_data,
             timeout=10
         )
         
-        print(f"📡 HTTP Status: {response.status_code}")
-        print(f"📝 Response Headers: {dict(response.headers)}")
-        
+        logger.info(f"📡 HTTP Status: {response.status_code}")
+        if logger.isEnabledFor(logging.DEBUG):
+            logger.debug("📝 Response Headers: %s", dict(response.headers))
+
         if response.status_code in [200, 201]:
-            print("✅ SUCCESS: Data sent and saved to database!")
-            try:
-                response_data = response.json()
-                print(f"📋 Response Data: {json.dumps(response_data, indent=2)}")
-            except:
-                print(f"📋 Response Text: {response.text}")
+            logger.info("✅ SUCCESS: Data sent and saved to database!")
+            if logger.isEnabledFor(logging.DEBUG):
+                try:
+                    logger.debug("📋 Response Data: %s", json.dumps(response.json(), indent=2))
+                except:
+                    logger.debug("📋 Response Text: %s", response.text)
         else:
-            print(f"❌ ERROR: HTTP {response.status_code}")
-            print(f"📋 Response: {response.text}")
-            
+            logger.error(f"❌ ERROR: HTTP {response.status_code}")
+            logger.error(f"📋 Response: {response.text}")
+
             # Common error diagnostics
             if response.status_code == 401:
-                print("🔧 Fix: Check your API key in Django admin")
+                logger.error("🔧 Fix: Check your API key in Django admin")
             elif response.status_code == 404:
-                print("🔧 Fix: Verify server URL and ensure Django is running")
+                logger.error("🔧 Fix: Verify server URL and ensure Django is running")
             elif response.status_code == 400:
-                print("🔧 Fix: Check data format and device registration")
-                
+                logger.error("🔧 Fix: Check data format and device registration")
+
     except requests.exceptions.ConnectionError:
-        print("❌ CONNECTION ERROR: Cannot reach server")
-        print("🔧 Fix: Ensure Django server is running on http://127.0.0.1:8000")
+        logger.error("❌ CONNECTION ERROR: Cannot reach server")
+        logger.error("🔧 Fix: Ensure Django server is running on http://127.0.0.1:8000")
     except requests.exceptions.Timeout:
-        print("❌ TIMEOUT ERROR: Server took too long to respond")
+        logger.error("❌ TIMEOUT ERROR: Server took too long to respond")
     except Exception as e:
-        print(f"❌ UNEXPECTED ERROR: {str(e)}")
+        logger.error(f"❌ UNEXPECTED ERROR: {str(e)}")
 
-def test_multiple_readings():
+def test_multiple_readings(count=5):
     """Send multiple readings to test continuous data flow"""
-    print("\n🔄 Testing Multiple Readings...")
-    
-    headers = {
-        'Content-Type': 'application/json',
-        'X-API-Key': API_KEY,
-        'User-Agent': 'IoT-Test-Script/1.0'
-    }
-    
+    logger.info("\n🔄 Testing Multiple Readings...")
+
+    # Simulate realistic water usage progression, vectorized so the
+    # generator scales to thousands of synthetic readings
+    rng = np.random.default_rng()
+    flow_rates = np.round(rng.uniform(0.1, 3.0, count), 2)
+    # Consumption accrues per 10-second interval from a 150 L starting value
+    totals = np.round(150.0 + np.cumsum(np.round(flow_rates / 6, 2)), 2)
+    pulse_counts = (totals * 450).astype(np.int64)  # YF-S201 pulse rate
+    timestamps = batch_timestamps(count)
+
     success_count = 0
-    total_consumption = 150.0  # Starting value
-    
-    for i in range(5):
-        # Simulate realistic water usage progression
-        flow_rate = round(random.uniform(0.1, 3.0), 2)
-        total_consumption += round(flow_rate / 6, 2)  # Add consumption (10-second intervals)
-        
+
+    for i in range(count):
         test_data = {
             'device_id': DEVICE_ID,
-            'flow_rate': flow_rate,
-            'total_consumption': round(total_consumption, 2),
-            'pulse_count': int(total_consumption * 450),  # YF-S201 pulse rate
-            'timestamp': datetime.now(timezone.utc).isoformat()
+            'flow_rate': float(flow_rates[i]),
+            'total_consumption': float(totals[i]),
+            'pulse_count': int(pulse_counts[i]),
+            'timestamp': timestamps[i]
         }
-        
+
         try:
-            response = requests.post(SERVER_URL, headers=headers, json=test_data, timeout=5)
+            response = session.post(SERVER_URL, json=test_data, timeout=5)
             if response.status_code in [200, 201]:
                 success_count += 1
-                print(f"✅ Reading {i+1}/5: Flow={flow_rate}L/min, Total={total_consumption}L")
+                logger.debug("✅ Reading %d/%d: Flow=%sL/min, Total=%sL",
+                             i+1, count, test_data['flow_rate'], test_data['total_consumption'])
             else:
-                print(f"❌ Reading {i+1}/5: HTTP {response.status_code}")
+                logger.error(f"❌ Reading {i+1}/{count}: HTTP {response.status_code}")
         except Exception as e:
-            print(f"❌ Reading {i+1}/5: {str(e)}")
-        
+            logger.error(f"❌ Reading {i+1}/{count}: {str(e)}")
+
         time.sleep(1)  # Wait 1 second between readings
-    
-    print(f"\n📊 Results: {success_count}/5 readings successful")
-    if success_count == 5:
-        print("🎉 All readings sent successfully! IoT integration is working.")
+
+    logger.info(f"\n📊 Results: {success_count}/{count} readings successful")
+    if success_count == count:
+        logger.info("🎉 All readings sent successfully! IoT integration is working.")
     else:
-        print("⚠️  Some readings failed. Check server logs for details.")
+        logger.warning("⚠️  Some readings failed. Check server logs for details.")
 
 def check_server_status():
     """Check if Django server is running"""
     try:
-        response = requests.get("http://127.0.0.1:8000/", timeout=5)
+        response = session.get("http://127.0.0.1:8000/", timeout=5)
         if response.status_code == 200:
-            print("✅ Django server is running")
+            logger.info("✅ Django server is running")
             return True
         else:
-            print(f"⚠️  Django server responded with status {response.status_code}")
+            logger.warning(f"⚠️  Django server responded with status {response.status_code}")
             return False
     except:
-        print("❌ Django server is not accessible")
+        logger.error("❌ Django server is not accessible")
         return False
 
 if __name__ == "__main__":
@@ -7,8 +7,8 @@ class DeviceAdmin(admin.ModelAdmin):
     list_display = ['device_id', 'name', 'location', 'owner', 'is_active', 'last_seen']
     list_filter = ['is_active', 'installation_date', 'owner']
     search_fields = ['device_id', 'name', 'location', 'owner__username']
-    readonly_fields = ['api_key', 'installation_date']
-    
+    readonly_fields = ['installation_date']
+
     fieldsets = (
         ('Device Information', {
             'fields': ('device_id', 'name', 'location', 'owner')
@@ -17,7 +17,7 @@ class DeviceAdmin(admin.ModelAdmin):
             'fields': ('pulse_rate', 'is_active')
         }),
         ('System', {
-            'fields': ('api_key', 'installation_date', 'last_seen'),
+            'fields': ('installation_date', 'last_seen'),
             'classes': ('collapse',)
         })
     )
@@ -30,7 +30,10 @@ class WaterUsageAdmin(admin.ModelAdmin):
     search_fields = ['device__name', 'device__device_id']
     readonly_fields = ['cost']
     date_hierarchy = 'timestamp'
-    
+    list_per_page = 50
+    # Skip the full-table COUNT(*) on every changelist load
+    show_full_result_count = False
+
     def get_queryset(self, request):
         return super().get_queryset(request).select_related('device')
 
@@ -45,8 +48,16 @@ class AlertAdmin(admin.ModelAdmin):
     actions = ['mark_resolved']
     
     def mark_resolved(self, request, queryset):
+        from django.core.cache import cache
         from django.utils import timezone
+        from .tasks import open_alert_cache_key
         queryset.update(is_resolved=True, resolved_at=timezone.now(), resolved_by=request.user)
+        # Drop the cached "open alert" flags so the next qualifying
+        # reading raises a fresh alert instead of being suppressed
+        cache.delete_many({
+            open_alert_cache_key(device_pk, alert_type)
+            for device_pk, alert_type in queryset.values_list('device_id', 'alert_type')
+        })
     mark_resolved.short_description = "Mark selected alerts as resolved"
 
 
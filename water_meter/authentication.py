@@ -1,7 +1,35 @@
+from functools import lru_cache
+
 from rest_framework.authentication import BaseAuthentication
 from rest_framework.exceptions import AuthenticationFailed
-from django.contrib.auth.models import AnonymousUser
-from .models import Device
+from django.db.models.signals import post_save, post_delete
+from django.dispatch import receiver
+from .models import Device, hash_api_key
+
+
+@lru_cache(maxsize=1024)
+def _resolve_device(api_key):
+    """Resolve an API key to its Device, caching hits in-process.
+
+    The raw key is HMAC-hashed and matched against the stored digest, so
+    only the fixed-width hash is ever compared or indexed. Failed lookups
+    raise Device.DoesNotExist and are not cached, so a key that is
+    provisioned later is picked up immediately.
+
+    select_related('owner') pulls the owner in the same JOIN (authenticate
+    returns it as the request user) and only() trims the SELECT to the
+    columns the auth path actually touches.
+    """
+    return Device.objects.select_related('owner').only(
+        'device_id', 'is_active', 'owner'
+    ).get(api_key_hash=hash_api_key(api_key), is_active=True)
+
+
+@receiver(post_save, sender=Device)
+@receiver(post_delete, sender=Device)
+def _invalidate_device_cache(sender, **kwargs):
+    """Drop cached lookups whenever a device is changed or removed"""
+    _resolve_device.cache_clear()
 
 
 class DeviceAPIKeyAuthentication(BaseAuthentication):
@@ -12,13 +40,13 @@ class DeviceAPIKeyAuthentication(BaseAuthentication):
         api_key = request.META.get('HTTP_X_API_KEY')
         if not api_key:
             return None
-        
+
         try:
-            device = Device.objects.get(api_key=api_key, is_active=True)
+            device = _resolve_device(api_key)
             # Return a tuple of (user, auth) where user is the device owner
             return (device.owner, device)
         except Device.DoesNotExist:
             raise AuthenticationFailed('Invalid API key')
-    
+
     def authenticate_header(self, request):
         return 'X-API-Key'
@@ -0,0 +1,19 @@
+# Generated by Django 4.2.30 on 2026-08-28 17:10
+
+from django.db import migrations, models
+import water_meter.models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('water_meter', '0001_initial'),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name='device',
+            name='api_key',
+            field=models.CharField(default=water_meter.models.generate_api_key, max_length=100, unique=True),
+        ),
+    ]
@@ -0,0 +1,38 @@
+from django.db import migrations
+
+
+def to_brin(apps, schema_editor):
+    """Swap the standalone timestamp B-tree for a BRIN index on Postgres.
+
+    WaterUsage is append-only time-series data, so a BRIN index covers the
+    same range scans at a fraction of the size and write amplification.
+    Other backends (the SQLite dev database) keep the B-tree.
+    """
+    if schema_editor.connection.vendor != 'postgresql':
+        return
+    schema_editor.execute('DROP INDEX IF EXISTS "water_meter_timesta_56bf27_idx"')
+    schema_editor.execute(
+        'CREATE INDEX "wu_ts_brin" ON "water_meter_waterusage" '
+        'USING brin ("timestamp") WITH (pages_per_range = 32)'
+    )
+
+
+def to_btree(apps, schema_editor):
+    if schema_editor.connection.vendor != 'postgresql':
+        return
+    schema_editor.execute('DROP INDEX IF EXISTS "wu_ts_brin"')
+    schema_editor.execute(
+        'CREATE INDEX "water_meter_timesta_56bf27_idx" '
+        'ON "water_meter_waterusage" ("timestamp")'
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('water_meter', '0002_alter_device_api_key'),
+    ]
+
+    operations = [
+        migrations.RunPython(to_brin, to_btree),
+    ]
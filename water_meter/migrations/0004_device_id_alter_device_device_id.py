@@ -0,0 +1,135 @@
+from django.db import migrations, models
+
+
+def backfill_ids(apps, schema_editor):
+    """Assign each existing device a distinct surrogate id.
+
+    AddField leaves the new column NULL on existing rows; number them in
+    installation order so the promotion to primary key below finds
+    unique values already in place.
+    """
+    Device = apps.get_model('water_meter', 'Device')
+    device_ids = Device.objects.order_by(
+        'installation_date', 'device_id'
+    ).values_list('device_id', flat=True)
+    for new_id, device_id in enumerate(device_ids, start=1):
+        Device.objects.filter(device_id=device_id).update(id=new_id)
+
+
+def swap_primary_key(apps, schema_editor):
+    """Move the PRIMARY KEY from device_id onto the backfilled id column.
+
+    The swap cannot be expressed as plain AlterFields: between the two
+    steps the model would hold either two primary keys or none. On
+    Postgres it is a constraint shuffle plus an identity default; on
+    SQLite (the dev database) the table is rebuilt around the new key,
+    the same copy-and-rename dance Django itself uses for ALTERs.
+    """
+    if schema_editor.connection.vendor == 'postgresql':
+        # The FK constraints on waterusage/alert/bill depend on the PK's
+        # unique index, so Postgres refuses to drop it while they exist.
+        # Their names are hashed, so look them up; 0005 rebuilds the FK
+        # columns against the new key right after this migration anyway.
+        with schema_editor.connection.cursor() as cursor:
+            cursor.execute(
+                "SELECT conrelid::regclass::text, conname FROM pg_constraint "
+                "WHERE contype = 'f' "
+                "AND confrelid = '\"water_meter_device\"'::regclass"
+            )
+            device_fks = cursor.fetchall()
+        # regclass::text already quotes and schema-qualifies when needed
+        for table, constraint in device_fks:
+            schema_editor.execute(
+                f'ALTER TABLE {table} DROP CONSTRAINT "{constraint}"'
+            )
+        schema_editor.execute(
+            'ALTER TABLE "water_meter_device" DROP CONSTRAINT "water_meter_device_pkey"'
+        )
+        schema_editor.execute(
+            'ALTER TABLE "water_meter_device" '
+            'ADD CONSTRAINT "water_meter_device_device_id_key" UNIQUE ("device_id")'
+        )
+        schema_editor.execute(
+            'ALTER TABLE "water_meter_device" ALTER COLUMN "id" SET NOT NULL'
+        )
+        schema_editor.execute(
+            'ALTER TABLE "water_meter_device" ADD PRIMARY KEY ("id")'
+        )
+        schema_editor.execute(
+            'ALTER TABLE "water_meter_device" '
+            'ALTER COLUMN "id" ADD GENERATED BY DEFAULT AS IDENTITY'
+        )
+        schema_editor.execute(
+            "SELECT setval(pg_get_serial_sequence('water_meter_device', 'id'), "
+            '(SELECT COALESCE(MAX("id"), 0) + 1 FROM "water_meter_device"), false)'
+        )
+        return
+
+    schema_editor.execute(
+        'CREATE TABLE "new__water_meter_device" ('
+        '"id" integer NOT NULL PRIMARY KEY AUTOINCREMENT, '
+        '"device_id" varchar(64) NOT NULL UNIQUE, '
+        '"name" varchar(200) NOT NULL, '
+        '"location" varchar(200) NOT NULL, '
+        '"api_key" varchar(100) NOT NULL UNIQUE, '
+        '"is_active" bool NOT NULL, '
+        '"installation_date" datetime NOT NULL, '
+        '"last_seen" datetime NULL, '
+        '"pulse_rate" real NOT NULL, '
+        '"owner_id" integer NOT NULL REFERENCES "auth_user" ("id") '
+        'DEFERRABLE INITIALLY DEFERRED)'
+    )
+    schema_editor.execute(
+        'INSERT INTO "new__water_meter_device" ("id", "device_id", "name", '
+        '"location", "api_key", "is_active", "installation_date", "last_seen", '
+        '"pulse_rate", "owner_id") '
+        'SELECT "id", "device_id", "name", "location", "api_key", "is_active", '
+        '"installation_date", "last_seen", "pulse_rate", "owner_id" '
+        'FROM "water_meter_device"'
+    )
+    schema_editor.execute('DROP TABLE "water_meter_device"')
+    schema_editor.execute(
+        'ALTER TABLE "new__water_meter_device" RENAME TO "water_meter_device"'
+    )
+    schema_editor.execute(
+        'CREATE INDEX "water_meter_device_owner_id_85d85afd" '
+        'ON "water_meter_device" ("owner_id")'
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('water_meter', '0003_waterusage_timestamp_brin'),
+    ]
+
+    # The PK swap happens in stages: id arrives as a plain nullable
+    # bigint, is backfilled with distinct values, and only then takes
+    # over as the primary key while device_id drops to a unique column.
+    # Adding it as a primary key directly would stamp one default value
+    # onto every existing row.
+    operations = [
+        migrations.AddField(
+            model_name='device',
+            name='id',
+            field=models.BigIntegerField(null=True),
+        ),
+        migrations.RunPython(backfill_ids, migrations.RunPython.noop),
+        migrations.SeparateDatabaseAndState(
+            state_operations=[
+                migrations.AlterField(
+                    model_name='device',
+                    name='device_id',
+                    field=models.CharField(db_index=True, max_length=64, unique=True),
+                ),
+                migrations.AlterField(
+                    model_name='device',
+                    name='id',
+                    field=models.BigAutoField(primary_key=True, serialize=False),
+                ),
+            ],
+            database_operations=[
+                migrations.RunPython(swap_primary_key, migrations.RunPython.noop),
+            ],
+        ),
+    ]
@@ -0,0 +1,64 @@
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+def remap_device_fks(apps, schema_editor):
+    """Point existing FK values at the new surrogate Device.id.
+
+    The related tables still hold the old string device_id as their FK
+    value; translate each to the id of the matching device row before the
+    columns are rebuilt against the new primary key. The FK column is
+    still varchar at this point, so the looked-up id is CAST back to
+    varchar — Postgres has no implicit bigint-to-text coercion (SQLite
+    doesn't mind either way).
+    """
+    for table in ('water_meter_waterusage', 'water_meter_alert', 'water_meter_bill'):
+        schema_editor.execute(
+            f'UPDATE "{table}" SET "device_id" = CAST(('
+            f'SELECT "id" FROM "water_meter_device" '
+            f'WHERE "water_meter_device"."device_id" = "{table}"."device_id"'
+            f') AS varchar)'
+        )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('water_meter', '0004_device_id_alter_device_device_id'),
+    ]
+
+    operations = [
+        migrations.RunPython(remap_device_fks, migrations.RunPython.noop),
+        # Toggling db_constraint forces a real column rebuild so the FKs
+        # reference Device.id (bigint) instead of the old varchar PK.
+        migrations.AlterField(
+            model_name='waterusage',
+            name='device',
+            field=models.ForeignKey(db_constraint=False, on_delete=django.db.models.deletion.CASCADE, related_name='readings', to='water_meter.device'),
+        ),
+        migrations.AlterField(
+            model_name='waterusage',
+            name='device',
+            field=models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='readings', to='water_meter.device'),
+        ),
+        migrations.AlterField(
+            model_name='alert',
+            name='device',
+            field=models.ForeignKey(db_constraint=False, on_delete=django.db.models.deletion.CASCADE, related_name='alerts', to='water_meter.device'),
+        ),
+        migrations.AlterField(
+            model_name='alert',
+            name='device',
+            field=models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='alerts', to='water_meter.device'),
+        ),
+        migrations.AlterField(
+            model_name='bill',
+            name='device',
+            field=models.ForeignKey(db_constraint=False, on_delete=django.db.models.deletion.CASCADE, related_name='bills', to='water_meter.device'),
+        ),
+        migrations.AlterField(
+            model_name='bill',
+            name='device',
+            field=models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='bills', to='water_meter.device'),
+        ),
+    ]
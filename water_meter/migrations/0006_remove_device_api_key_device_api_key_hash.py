@@ -0,0 +1,36 @@
+# Generated by Django 4.2.30 on 2026-08-28 17:18
+
+import hmac
+
+from django.conf import settings
+from django.db import migrations, models
+
+
+def hash_existing_keys(apps, schema_editor):
+    """Backfill api_key_hash from the plaintext keys before they are dropped"""
+    Device = apps.get_model('water_meter', 'Device')
+    for device in Device.objects.exclude(api_key=''):
+        device.api_key_hash = hmac.new(
+            settings.API_KEY_PEPPER.encode(), device.api_key.encode(), 'sha256'
+        ).digest()
+        device.save(update_fields=['api_key_hash'])
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('water_meter', '0005_rewire_device_foreign_keys'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='device',
+            name='api_key_hash',
+            field=models.BinaryField(blank=True, max_length=32, null=True, unique=True),
+        ),
+        migrations.RunPython(hash_existing_keys, migrations.RunPython.noop),
+        migrations.RemoveField(
+            model_name='device',
+            name='api_key',
+        ),
+    ]
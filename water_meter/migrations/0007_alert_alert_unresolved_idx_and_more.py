@@ -0,0 +1,21 @@
+# Generated by Django 4.2.30 on 2026-08-28 17:19
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('water_meter', '0006_remove_device_api_key_device_api_key_hash'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='alert',
+            index=models.Index(fields=['is_resolved', '-timestamp'], name='alert_unresolved_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='device',
+            index=models.Index(fields=['owner', 'is_active'], name='water_meter_owner_i_44cf63_idx'),
+        ),
+    ]
@@ -0,0 +1,54 @@
+from django.db import migrations
+
+CREATE_TRIGGER = """
+CREATE OR REPLACE FUNCTION water_meter_calc_daily_consumption() RETURNS trigger AS $$
+BEGIN
+    NEW.daily_consumption := NEW.total_consumption - COALESCE((
+        SELECT MAX(w.total_consumption)
+        FROM water_meter_waterusage w
+        WHERE w.device_id = NEW.device_id
+          AND w.timestamp < date_trunc('day', NEW.timestamp)
+    ), NEW.total_consumption);
+    RETURN NEW;
+END;
+$$ LANGUAGE plpgsql;
+
+CREATE TRIGGER wu_daily_consumption
+BEFORE INSERT ON water_meter_waterusage
+FOR EACH ROW EXECUTE FUNCTION water_meter_calc_daily_consumption();
+"""
+
+DROP_TRIGGER = """
+DROP TRIGGER IF EXISTS wu_daily_consumption ON water_meter_waterusage;
+DROP FUNCTION IF EXISTS water_meter_calc_daily_consumption();
+"""
+
+
+def add_trigger(apps, schema_editor):
+    """Maintain daily_consumption in the database at INSERT time.
+
+    The meter reports a cumulative total; the trigger derives the
+    day's consumption as the delta against the last reading before
+    midnight, so no follow-up UPDATE per row is needed. Postgres only -
+    other backends leave the column to be filled by whatever inserts.
+    """
+    if schema_editor.connection.vendor != 'postgresql':
+        return
+    schema_editor.execute(CREATE_TRIGGER)
+
+
+def drop_trigger(apps, schema_editor):
+    if schema_editor.connection.vendor != 'postgresql':
+        return
+    schema_editor.execute(DROP_TRIGGER)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('water_meter', '0007_alert_alert_unresolved_idx_and_more'),
+    ]
+
+    operations = [
+        migrations.RunPython(add_trigger, drop_trigger),
+    ]
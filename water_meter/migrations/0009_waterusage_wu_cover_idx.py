@@ -0,0 +1,17 @@
+# Generated by Django 4.2.30 on 2026-08-28 17:23
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('water_meter', '0008_waterusage_daily_consumption_trigger'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='waterusage',
+            index=models.Index(fields=['device', 'timestamp', 'total_consumption', 'flow_rate'], name='wu_cover_idx'),
+        ),
+    ]
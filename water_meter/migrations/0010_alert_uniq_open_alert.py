@@ -0,0 +1,17 @@
+# Generated by Django 4.2.30 on 2026-08-28 17:24
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('water_meter', '0009_waterusage_wu_cover_idx'),
+    ]
+
+    operations = [
+        migrations.AddConstraint(
+            model_name='alert',
+            constraint=models.UniqueConstraint(condition=models.Q(('is_resolved', False)), fields=('device', 'alert_type'), name='uniq_open_alert'),
+        ),
+    ]
@@ -0,0 +1,42 @@
+from django.db import migrations
+
+
+def create_rollup(apps, schema_editor):
+    """Create the wu_daily_rollup materialized view on Postgres.
+
+    One row per (device, day) with the day's summed consumption, so the
+    dashboard's month total reads a handful of rollup rows instead of
+    re-scanning the raw readings table on every hit. The unique index is
+    required for REFRESH MATERIALIZED VIEW CONCURRENTLY (see
+    tasks.refresh_daily_rollup). Other backends (the SQLite dev database)
+    keep aggregating the raw table.
+    """
+    if schema_editor.connection.vendor != 'postgresql':
+        return
+    schema_editor.execute(
+        'CREATE MATERIALIZED VIEW "wu_daily_rollup" AS '
+        'SELECT "device_id", "timestamp"::date AS "day", '
+        'SUM("total_consumption") AS "total" '
+        'FROM "water_meter_waterusage" GROUP BY 1, 2'
+    )
+    schema_editor.execute(
+        'CREATE UNIQUE INDEX "wu_daily_rollup_uniq" '
+        'ON "wu_daily_rollup" ("device_id", "day")'
+    )
+
+
+def drop_rollup(apps, schema_editor):
+    if schema_editor.connection.vendor != 'postgresql':
+        return
+    schema_editor.execute('DROP MATERIALIZED VIEW IF EXISTS "wu_daily_rollup"')
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('water_meter', '0010_alert_uniq_open_alert'),
+    ]
+
+    operations = [
+        migrations.RunPython(create_rollup, drop_rollup),
+    ]
@@ -1,28 +1,61 @@
+from decimal import Decimal
+
+from django.conf import settings
 from django.db import models
 from django.contrib.auth.models import User
 from django.utils import timezone
-import uuid
+import hmac
+import secrets
+
+# Resolved once at import so the per-row save path avoids the LazySettings
+# lookup and float->Decimal coercion on every reading.
+WATER_RATE = Decimal(str(settings.WATER_RATE_PER_LITER))
+
+
+def generate_api_key():
+    """Generate a secure API key for device authentication"""
+    return secrets.token_urlsafe(24)
+
+
+def hash_api_key(api_key):
+    """HMAC-SHA256 the raw key under the server pepper.
+
+    Only the 32-byte digest is stored and indexed, so database dumps never
+    contain usable device credentials and the unique index key stays
+    fixed-width.
+    """
+    return hmac.new(settings.API_KEY_PEPPER.encode(), api_key.encode(), 'sha256').digest()
 
 
 class Device(models.Model):
     """Water meter device model"""
-    device_id = models.CharField(max_length=100, unique=True, primary_key=True)
+    # Surrogate integer PK keeps FK indexes on WaterUsage/Alert/Bill at
+    # 8 bytes per key; device_id stays as the external lookup handle
+    id = models.BigAutoField(primary_key=True)
+    device_id = models.CharField(max_length=64, unique=True, db_index=True)
     name = models.CharField(max_length=200)
     location = models.CharField(max_length=200)
     owner = models.ForeignKey(User, on_delete=models.CASCADE, related_name='devices')
-    api_key = models.CharField(max_length=100, unique=True, default=uuid.uuid4)
+    api_key_hash = models.BinaryField(max_length=32, unique=True, null=True, blank=True, editable=False)
     is_active = models.BooleanField(default=True)
     installation_date = models.DateTimeField(default=timezone.now)
     last_seen = models.DateTimeField(null=True, blank=True)
     
     # Device specifications
     pulse_rate = models.FloatField(default=450.0, help_text="Pulses per liter")
-    
+
+    def set_api_key(self, api_key):
+        """Store the HMAC of a raw API key; the key itself is never persisted"""
+        self.api_key_hash = hash_api_key(api_key)
+
     def __str__(self):
         return f"{self.name} ({self.device_id})"
-    
+
     class Meta:
         ordering = ['-installation_date']
+        indexes = [
+            models.Index(fields=['owner', 'is_active']),
+        ]
 
 
 class WaterUsage(models.Model):
@@ -42,9 +75,8 @@ class WaterUsage(models.Model):
     
     def save(self, *args, **kwargs):
         # Calculate cost based on consumption
-        from django.conf import settings
-        if self.total_consumption:
-            self.cost = self.total_consumption * settings.WATER_RATE_PER_LITER
+        if self.total_consumption is not None:
+            self.cost = Decimal(str(self.total_consumption)) * WATER_RATE
         super().save(*args, **kwargs)
     
     class Meta:
@@ -52,6 +84,12 @@ class WaterUsage(models.Model):
         indexes = [
             models.Index(fields=['device', '-timestamp']),
             models.Index(fields=['timestamp']),
+            # Covering index: the alert-check and dashboard aggregates read
+            # only these columns, enabling index-only scans
+            models.Index(
+                fields=['device', 'timestamp', 'total_consumption', 'flow_rate'],
+                name='wu_cover_idx',
+            ),
         ]
 
 
@@ -86,9 +124,21 @@ class Alert(models.Model):
     
     def __str__(self):
         return f"{self.device.name} - {self.get_alert_type_display()} - {self.timestamp}"
-    
+
     class Meta:
         ordering = ['-timestamp']
+        indexes = [
+            models.Index(fields=['is_resolved', '-timestamp'], name='alert_unresolved_idx'),
+        ]
+        constraints = [
+            # One open alert per device and type; stops concurrent ingests
+            # from racing duplicate alerts into existence
+            models.UniqueConstraint(
+                fields=['device', 'alert_type'],
+                condition=models.Q(is_resolved=False),
+                name='uniq_open_alert',
+            ),
+        ]
 
 
 class UserProfile(models.Model):
@@ -1,23 +1,63 @@
-from rest_framework import serializers
-from django.contrib.auth.models import User
-from .models import Device, WaterUsage, Alert, UserProfile, Bill
+import atexit
+import threading
 
+from decimal import Decimal
 
-class UserSerializer(serializers.ModelSerializer):
-    class Meta:
-        model = User
-        fields = ['id', 'username', 'email', 'first_name', 'last_name']
-        read_only_fields = ['id']
+from rest_framework import serializers
+from django.conf import settings
+from django.db.models import Case, When
+from django.utils import timezone
+from .models import Device, WaterUsage, Alert, UserProfile, Bill, WATER_RATE
+from .tasks import queue_reading
+
+
+class LastSeenBuffer:
+    """Debounces Device.last_seen updates from the ingest path.
+
+    Instead of issuing one UPDATE per reading, timestamps are buffered
+    in-process and flushed every few seconds as a single bulk UPDATE,
+    halving the write load per IoT POST.
+    """
+    FLUSH_INTERVAL = 5.0  # seconds
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._pending = {}
+        self._timer = None
+
+    def update(self, device_pk, timestamp):
+        with self._lock:
+            self._pending[device_pk] = timestamp
+            if self._timer is None:
+                self._timer = threading.Timer(self.FLUSH_INTERVAL, self.flush)
+                self._timer.daemon = True
+                self._timer.start()
+
+    def flush(self):
+        with self._lock:
+            if self._timer is not None:
+                self._timer.cancel()
+                self._timer = None
+            pending, self._pending = self._pending, {}
+        if not pending:
+            return
+        Device.objects.filter(pk__in=pending).update(
+            last_seen=Case(*[When(pk=pk, then=ts) for pk, ts in pending.items()])
+        )
+
+
+last_seen_buffer = LastSeenBuffer()
+atexit.register(last_seen_buffer.flush)
 
 
 class DeviceSerializer(serializers.ModelSerializer):
-    owner = UserSerializer(read_only=True)
-    
+    owner_username = serializers.CharField(source='owner.username', read_only=True)
+
     class Meta:
         model = Device
-        fields = ['device_id', 'name', 'location', 'owner', 'is_active', 
+        fields = ['device_id', 'name', 'location', 'owner_username', 'is_active',
                  'installation_date', 'last_seen', 'pulse_rate']
-        read_only_fields = ['api_key', 'installation_date', 'last_seen']
+        read_only_fields = ['installation_date', 'last_seen']
 
 
 class WaterUsageSerializer(serializers.ModelSerializer):
@@ -31,29 +71,68 @@ class WaterUsageSerializer(serializers.ModelSerializer):
         read_only_fields = ['id', 'cost', 'daily_consumption']
 
 
+class WaterUsageBulkCreateSerializer(serializers.ListSerializer):
+    """Creates a batch of readings with one device lookup and one INSERT.
+
+    Gateways that buffer readings can POST a JSON array; cost is
+    precomputed in Python (bulk_create skips model save()) and the whole
+    batch goes to the database as multi-row INSERTs.
+    """
+    def create(self, validated_data):
+        device_ids = {item['device_id'] for item in validated_data}
+        devices = Device.objects.filter(is_active=True).in_bulk(
+            device_ids, field_name='device_id'
+        )
+        missing = device_ids - set(devices)
+        if missing:
+            raise serializers.ValidationError(
+                {'device_id': f"Device not found or inactive: {', '.join(sorted(missing))}"}
+            )
+
+        objs = []
+        for item in validated_data:
+            item = dict(item)
+            device = devices[item.pop('device_id')]
+            if item.get('total_consumption') is not None:
+                item['cost'] = Decimal(str(item['total_consumption'])) * WATER_RATE
+            objs.append(WaterUsage(device=device, **item))
+
+        now = timezone.now()
+        for device in devices.values():
+            last_seen_buffer.update(device.pk, now)
+
+        return WaterUsage.objects.bulk_create(
+            objs, batch_size=1000, ignore_conflicts=True
+        )
+
+
 class WaterUsageCreateSerializer(serializers.ModelSerializer):
     """Serializer for creating water usage records from IoT devices"""
     device_id = serializers.CharField(write_only=True)
-    
+
     class Meta:
         model = WaterUsage
         fields = ['device_id', 'flow_rate', 'total_consumption', 'pulse_count', 'timestamp']
-    
+        list_serializer_class = WaterUsageBulkCreateSerializer
+
     def create(self, validated_data):
         device_id = validated_data.pop('device_id')
         try:
             device = Device.objects.get(device_id=device_id, is_active=True)
-            validated_data['device'] = device
-            
-            # Update device last_seen
-            from django.utils import timezone
-            device.last_seen = timezone.now()
-            device.save(update_fields=['last_seen'])
-            
-            return super().create(validated_data)
         except Device.DoesNotExist:
             raise serializers.ValidationError({'device_id': 'Device not found or inactive'})
 
+        # Update device last_seen (debounced, flushed as one bulk UPDATE)
+        last_seen_buffer.update(device.pk, timezone.now())
+
+        # Opt-in write buffer: park the reading in Redis and let the beat
+        # task flush the batch as one bulk INSERT
+        if settings.INGEST_BUFFER_ENABLED:
+            return queue_reading(device, validated_data)
+
+        validated_data['device'] = device
+        return super().create(validated_data)
+
 
 class AlertSerializer(serializers.ModelSerializer):
     device_name = serializers.CharField(source='device.name', read_only=True)
@@ -68,23 +147,23 @@ class AlertSerializer(serializers.ModelSerializer):
 
 
 class UserProfileSerializer(serializers.ModelSerializer):
-    user = UserSerializer(read_only=True)
-    
+    username = serializers.CharField(source='user.username', read_only=True)
+
     class Meta:
         model = UserProfile
-        fields = ['user', 'phone_number', 'address', 'email_notifications', 
+        fields = ['username', 'phone_number', 'address', 'email_notifications',
                  'sms_notifications', 'billing_cycle']
 
 
 class BillSerializer(serializers.ModelSerializer):
-    user = UserSerializer(read_only=True)
-    device = DeviceSerializer(read_only=True)
-    
+    user_username = serializers.CharField(source='user.username', read_only=True)
+    device_name = serializers.CharField(source='device.name', read_only=True)
+
     class Meta:
         model = Bill
-        fields = ['id', 'user', 'device', 'start_date', 'end_date', 
-                 'total_consumption', 'total_cost', 'is_paid', 'generated_at', 
-                 'due_date', 'paid_at']
+        fields = ['id', 'user_username', 'device', 'device_name', 'start_date',
+                 'end_date', 'total_consumption', 'total_cost', 'is_paid',
+                 'generated_at', 'due_date', 'paid_at']
         read_only_fields = ['id', 'generated_at']
 
 
@@ -0,0 +1,185 @@
+import json
+import logging
+from datetime import datetime, timedelta
+from decimal import Decimal
+
+import redis
+from celery import shared_task
+from django.conf import settings
+from django.core.cache import cache
+from django.db import connection
+from django.db.models import Sum, Avg, Count, Q
+from django.utils import timezone
+
+from .models import Device, WaterUsage, Alert, WATER_RATE
+
+logger = logging.getLogger(__name__)
+
+# Redis list backing the opt-in ingest write buffer; see queue_reading
+# and flush_ingest_buffer
+INGEST_BUFFER_KEY = 'ingest:buffer'
+INGEST_FLUSH_BATCH = 500
+
+# Resolved once at import, like models.WATER_RATE: spares the alert path
+# the LazySettings lookups and the per-minute division on every check
+LEAK_THRESHOLD_PER_MIN = settings.LEAK_THRESHOLD_LITERS_PER_HOUR / 60
+EXCESSIVE_DAILY = settings.EXCESSIVE_USAGE_THRESHOLD_LITERS_PER_DAY
+
+# How long a cached "open alert exists" flag suppresses re-upserting the
+# same alert; resolution deletes the flag so new alerts fire immediately
+OPEN_ALERT_CACHE_TTL = 300
+
+_redis_client = None
+
+
+def open_alert_cache_key(device_pk, alert_type):
+    return f'alert:{device_pk}:{alert_type}'
+
+
+def _ingest_redis():
+    global _redis_client
+    if _redis_client is None:
+        _redis_client = redis.Redis.from_url(settings.CELERY_BROKER_URL)
+    return _redis_client
+
+
+def queue_reading(device, validated_data):
+    """Queue one reading in Redis for the next buffer flush.
+
+    Returns an unsaved WaterUsage so the API response can echo the
+    accepted reading; the row itself is INSERTed in bulk by
+    flush_ingest_buffer, trading ~1s of ingest latency for amortized
+    per-row commit overhead.
+    """
+    usage = WaterUsage(device=device, **validated_data)
+    if usage.total_consumption is not None:
+        usage.cost = Decimal(str(usage.total_consumption)) * WATER_RATE
+    payload = {
+        'device_id': device.pk,
+        'timestamp': usage.timestamp.isoformat(),
+        'flow_rate': usage.flow_rate,
+        'total_consumption': usage.total_consumption,
+        'pulse_count': usage.pulse_count,
+        'cost': str(usage.cost) if usage.cost is not None else None,
+    }
+    _ingest_redis().rpush(INGEST_BUFFER_KEY, json.dumps(payload))
+    return usage
+
+
+@shared_task
+def flush_ingest_buffer():
+    """Drain the Redis ingest buffer into a single bulk INSERT.
+
+    Scheduled every second by Celery beat when INGEST_BUFFER_ENABLED;
+    a pipelined LRANGE+LTRIM claims a batch atomically so concurrent
+    flushes never insert the same reading twice.
+    """
+    pipe = _ingest_redis().pipeline()
+    pipe.lrange(INGEST_BUFFER_KEY, 0, INGEST_FLUSH_BATCH - 1)
+    pipe.ltrim(INGEST_BUFFER_KEY, INGEST_FLUSH_BATCH, -1)
+    raw, _ = pipe.execute()
+    if not raw:
+        return 0
+
+    objs = []
+    for entry in raw:
+        item = json.loads(entry)
+        item['timestamp'] = datetime.fromisoformat(item['timestamp'])
+        if item['cost'] is not None:
+            item['cost'] = Decimal(item['cost'])
+        objs.append(WaterUsage(**item))
+
+    WaterUsage.objects.bulk_create(objs, batch_size=INGEST_FLUSH_BATCH,
+                                   ignore_conflicts=True)
+    for device_pk in {obj.device_id for obj in objs}:
+        check_for_alerts.delay(device_pk)
+
+    logger.info(f"Flushed {len(objs)} buffered readings")
+    return len(objs)
+
+
+@shared_task
+def refresh_daily_rollup():
+    """Refresh the wu_daily_rollup materialized view (Postgres only).
+
+    Scheduled every five minutes by Celery beat; CONCURRENTLY keeps the
+    view readable during the refresh. No-op on other backends, which
+    aggregate the raw table directly.
+    """
+    if connection.vendor != 'postgresql':
+        return
+    with connection.cursor() as cursor:
+        cursor.execute('REFRESH MATERIALIZED VIEW CONCURRENTLY "wu_daily_rollup"')
+
+
+@shared_task
+def check_for_alerts(device_pk):
+    """Check for leak detection and excessive usage alerts.
+
+    Runs on a worker so the IoT POST returns as soon as the reading's
+    INSERT commits, instead of blocking on the aggregate and alert writes.
+    """
+    try:
+        device = Device.objects.get(pk=device_pk)
+    except Device.DoesNotExist:
+        logger.warning(f"Alert check skipped: device {device_pk} no longer exists")
+        return
+
+    now = timezone.now()
+    hour_ago = now - timedelta(hours=1)
+    # Plain bound rather than __date: DATE(timestamp) would defeat the
+    # (device, timestamp) index
+    day_start = now.replace(hour=0, minute=0, second=0, microsecond=0)
+
+    # One scan over today's readings serves both checks: filtered
+    # aggregates return the hour's flow average/count for leak
+    # detection alongside the day's consumption total
+    stats = WaterUsage.objects.filter(
+        device=device,
+        timestamp__gte=day_start
+    ).aggregate(
+        daily=Sum('total_consumption'),
+        recent_avg=Avg('flow_rate', filter=Q(timestamp__gte=hour_ago)),
+        recent_n=Count('pk', filter=Q(timestamp__gte=hour_ago)),
+    )
+
+    # Nothing recorded today: neither threshold can trigger
+    if not stats['recent_n'] and not stats['daily']:
+        return
+
+    # Check for leak (continuous flow for extended period,
+    # at least 6 readings = 1 hour of data). A cached "open alert" flag
+    # skips the upsert while the alert is known to exist already
+    if stats['recent_n'] >= 6:
+        avg_flow = stats['recent_avg']
+        leak_key = open_alert_cache_key(device.pk, 'leak')
+        if avg_flow > LEAK_THRESHOLD_PER_MIN and not cache.get(leak_key):
+            Alert.objects.update_or_create(
+                device=device,
+                alert_type='leak',
+                is_resolved=False,
+                defaults={
+                    'severity': 'high',
+                    'message': f'Potential leak detected. Continuous flow of {avg_flow:.2f} L/min for over 1 hour.',
+                    'threshold_value': LEAK_THRESHOLD_PER_MIN,
+                    'actual_value': avg_flow
+                }
+            )
+            cache.set(leak_key, 1, OPEN_ALERT_CACHE_TTL)
+
+    # Check for excessive daily usage
+    daily_usage = stats['daily'] or 0
+    excessive_key = open_alert_cache_key(device.pk, 'excessive')
+    if daily_usage > EXCESSIVE_DAILY and not cache.get(excessive_key):
+        Alert.objects.update_or_create(
+            device=device,
+            alert_type='excessive',
+            is_resolved=False,
+            defaults={
+                'severity': 'medium',
+                'message': f'Excessive water usage detected. Daily consumption: {daily_usage:.2f} liters.',
+                'threshold_value': EXCESSIVE_DAILY,
+                'actual_value': daily_usage
+            }
+        )
+        cache.set(excessive_key, 1, OPEN_ALERT_CACHE_TTL)
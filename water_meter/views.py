@@ -1,13 +1,25 @@
-from django.shortcuts import render
+import json
+import logging
+
+from django.conf import settings
+from django.core.serializers.json import DjangoJSONEncoder
+from django.http import StreamingHttpResponse
+from django.shortcuts import render, redirect
 from django.contrib.auth.decorators import login_required
+from django.core.cache import cache
 from django.utils.decorators import method_decorator
-from django.db.models import Sum, Avg, Count, Q
+from django.views.decorators.cache import cache_page
+from django.views.decorators.vary import vary_on_cookie
+from django.db import connection, transaction
+from django.db.models import F, Sum, Avg, Count, Q
 from django.utils import timezone
-from datetime import datetime, timedelta
+from datetime import datetime, time, timedelta
 from rest_framework import generics, status, permissions
 from rest_framework.decorators import api_view, permission_classes
+from rest_framework.exceptions import ValidationError
 from rest_framework.response import Response
 from rest_framework.views import APIView
+from rest_framework.pagination import CursorPagination
 from rest_framework.permissions import IsAuthenticated, AllowAny
 from .models import Device, WaterUsage, Alert, UserProfile, Bill
 from .serializers import (
@@ -15,6 +27,18 @@ from .serializers import (
     AlertSerializer, UserProfileSerializer, BillSerializer, DashboardStatsSerializer
 )
 from .authentication import DeviceAPIKeyAuthentication
+from .tasks import check_for_alerts
+
+# Dashboard payloads only change when a device posts, so a short TTL plus
+# invalidation on ingest keeps them fresh without recomputing per poll
+DASHBOARD_CACHE_TTL = 30
+
+
+def _dashboard_cache_key(user_id):
+    return f'dash:{user_id}'
+
+
+logger = logging.getLogger(__name__)
 
 
 class WaterUsageCreateView(generics.CreateAPIView):
@@ -23,25 +47,51 @@ class WaterUsageCreateView(generics.CreateAPIView):
     authentication_classes = [DeviceAPIKeyAuthentication]
     permission_classes = [IsAuthenticated]
     
+    def get_serializer(self, *args, **kwargs):
+        # A JSON array takes the bulk_create path via the list serializer
+        if isinstance(self.request.data, list):
+            kwargs.setdefault('many', True)
+        return super().get_serializer(*args, **kwargs)
+
     def perform_create(self, serializer):
+        # Keep the transaction to just the INSERT; authentication and alert
+        # evaluation stay outside so the write lock is held only briefly
+        with transaction.atomic():
+            instance = serializer.save()
+
+        if isinstance(instance, list):
+            logger.info(f"Bulk water usage batch saved: {len(instance)} readings")
+            # Alerts only need the newest reading per device in the batch
+            latest_per_device = {usage.device_id: usage for usage in instance}
+            cache.delete_many({
+                _dashboard_cache_key(usage.device.owner_id)
+                for usage in latest_per_device.values()
+            })
+            for usage in latest_per_device.values():
+                transaction.on_commit(
+                    lambda device_pk=usage.device_id: check_for_alerts.delay(device_pk)
+                )
+            return
+
         # Get the device from authentication
         device = self.request.auth
-        instance = serializer.save()
-        
-        # Log successful data save
-        import logging
-        logger = logging.getLogger(__name__)
         logger.info(f"Water usage data saved for device {device.device_id}: "
                    f"Flow: {instance.flow_rate}L/min, Total: {instance.total_consumption}L")
-        
-        # Check for alerts after saving the data
-        self.check_for_alerts(device, instance)
-    
+
+        # New data invalidates the owner's cached dashboard payload
+        cache.delete(_dashboard_cache_key(device.owner_id))
+
+        # Buffered readings are INSERTed (and alert-checked) later by
+        # flush_ingest_buffer, so there is nothing to dispatch yet
+        if settings.INGEST_BUFFER_ENABLED:
+            return
+
+        # Queue alert evaluation on a worker once the reading's INSERT has
+        # committed; the device's POST returns without waiting for it
+        transaction.on_commit(lambda: check_for_alerts.delay(device.pk))
+
     def create(self, request, *args, **kwargs):
         """Override create to add better error handling and logging"""
-        import logging
-        logger = logging.getLogger(__name__)
-        
         try:
             logger.info(f"Received IoT data: {request.data}")
             response = super().create(request, *args, **kwargs)
@@ -50,63 +100,32 @@ class WaterUsageCreateView(generics.CreateAPIView):
         except Exception as e:
             logger.error(f"Error processing IoT data: {str(e)}")
             return Response(
-                {'error': 'Failed to process data', 'details': str(e)}, 
+                {'error': 'Failed to process data', 'details': str(e)},
                 status=status.HTTP_400_BAD_REQUEST
             )
-    
-    def check_for_alerts(self, device, usage):
-        """Check for leak detection and excessive usage alerts"""
-        from django.conf import settings
-        
-        # Check for leak (continuous flow for extended period)
-        recent_readings = WaterUsage.objects.filter(
-            device=device,
-            timestamp__gte=timezone.now() - timedelta(hours=1)
-        ).order_by('-timestamp')[:6]  # Last 6 readings (1 hour of data)
-        
-        if len(recent_readings) >= 6:
-            avg_flow = sum(r.flow_rate for r in recent_readings) / len(recent_readings)
-            if avg_flow > settings.LEAK_THRESHOLD_LITERS_PER_HOUR / 60:  # Convert to per minute
-                Alert.objects.get_or_create(
-                    device=device,
-                    alert_type='leak',
-                    is_resolved=False,
-                    defaults={
-                        'severity': 'high',
-                        'message': f'Potential leak detected. Continuous flow of {avg_flow:.2f} L/min for over 1 hour.',
-                        'threshold_value': settings.LEAK_THRESHOLD_LITERS_PER_HOUR / 60,
-                        'actual_value': avg_flow
-                    }
-                )
-        
-        # Check for excessive daily usage
-        today = timezone.now().date()
-        daily_usage = WaterUsage.objects.filter(
-            device=device,
-            timestamp__date=today
-        ).aggregate(total=Sum('total_consumption'))['total'] or 0
-        
-        if daily_usage > settings.EXCESSIVE_USAGE_THRESHOLD_LITERS_PER_DAY:
-            Alert.objects.get_or_create(
-                device=device,
-                alert_type='excessive',
-                is_resolved=False,
-                defaults={
-                    'severity': 'medium',
-                    'message': f'Excessive water usage detected. Daily consumption: {daily_usage:.2f} liters.',
-                    'threshold_value': settings.EXCESSIVE_USAGE_THRESHOLD_LITERS_PER_DAY,
-                    'actual_value': daily_usage
-                }
-            )
+
+
+class TimestampCursorPagination(CursorPagination):
+    """Keyset pagination over the timestamp index.
+
+    Deep pages seek directly to the cursor position instead of paying
+    O(offset) for OFFSET/LIMIT on a growing table.
+    """
+    ordering = '-timestamp'
+    page_size = 50
 
 
 class WaterUsageListView(generics.ListAPIView):
     """API endpoint to retrieve water usage data"""
     serializer_class = WaterUsageSerializer
     permission_classes = [IsAuthenticated]
-    
+    pagination_class = TimestampCursorPagination
+
     def get_queryset(self):
-        queryset = WaterUsage.objects.select_related('device')
+        queryset = WaterUsage.objects.select_related('device').only(
+            'id', 'timestamp', 'flow_rate', 'total_consumption', 'pulse_count',
+            'daily_consumption', 'cost', 'device__name', 'device__location'
+        )
         
         # Filter by user's devices
         if not self.request.user.is_staff:
@@ -117,16 +136,65 @@ class WaterUsageListView(generics.ListAPIView):
         if device_id:
             queryset = queryset.filter(device__device_id=device_id)
         
-        # Filter by date range
-        start_date = self.request.query_params.get('start_date')
-        end_date = self.request.query_params.get('end_date')
+        # Filter by date range; parsed up front so bad input fails fast
+        # with a 400, and applied as half-open timestamp bounds that use
+        # the index instead of a per-row DATE() cast
+        start_date = self._parse_date(self.request.query_params.get('start_date'), 'start_date')
+        end_date = self._parse_date(self.request.query_params.get('end_date'), 'end_date')
         if start_date:
-            queryset = queryset.filter(timestamp__date__gte=start_date)
+            queryset = queryset.filter(
+                timestamp__gte=timezone.make_aware(datetime.combine(start_date, time.min))
+            )
         if end_date:
-            queryset = queryset.filter(timestamp__date__lte=end_date)
-        
+            # Inclusive end date: bound at the following midnight
+            queryset = queryset.filter(
+                timestamp__lt=timezone.make_aware(
+                    datetime.combine(end_date + timedelta(days=1), time.min)
+                )
+            )
+
         return queryset.order_by('-timestamp')
 
+    @staticmethod
+    def _parse_date(value, param):
+        if not value:
+            return None
+        try:
+            return datetime.strptime(value, '%Y-%m-%d').date()
+        except ValueError:
+            raise ValidationError({param: 'Expected a date in YYYY-MM-DD format'})
+
+    def list(self, request, *args, **kwargs):
+        # ?export=true streams the full result set instead of paginating;
+        # analytics pulls can be thousands of rows and materializing them
+        # (plus a DRF serializer each) dominates the request time
+        if request.query_params.get('export', '').lower() == 'true':
+            return StreamingHttpResponse(
+                self._stream_export(self.filter_queryset(self.get_queryset())),
+                content_type='application/json',
+            )
+        return super().list(request, *args, **kwargs)
+
+    @staticmethod
+    def _stream_export(queryset):
+        """Yield the queryset as a JSON array, one row at a time.
+
+        iterator() stops Django from caching the result set, so peak
+        memory stays at O(chunk_size) regardless of the export size.
+        """
+        yield '['
+        first = True
+        rows = queryset.values(
+            'id', 'timestamp', 'flow_rate', 'total_consumption',
+            'pulse_count', 'daily_consumption', 'cost',
+            device_name=F('device__name'),
+            device_location=F('device__location'),
+        ).iterator(chunk_size=2000)
+        for row in rows:
+            yield ('' if first else ',') + json.dumps(row, cls=DjangoJSONEncoder)
+            first = False
+        yield ']'
+
 
 class DeviceListView(generics.ListAPIView):
     """API endpoint to list user's devices"""
@@ -134,19 +202,32 @@ class DeviceListView(generics.ListAPIView):
     permission_classes = [IsAuthenticated]
     
     def get_queryset(self):
+        # only() keeps api_key_hash (and the owner row beyond the
+        # username) out of the transfer; the serializer reads nothing else
+        queryset = Device.objects.select_related('owner').only(
+            'device_id', 'name', 'location', 'is_active', 'installation_date',
+            'last_seen', 'pulse_rate', 'owner__username'
+        )
         if self.request.user.is_staff:
-            return Device.objects.all()
-        return Device.objects.filter(owner=self.request.user)
+            return queryset
+        return queryset.filter(owner=self.request.user)
 
 
 class AlertListView(generics.ListAPIView):
     """API endpoint to list alerts"""
     serializer_class = AlertSerializer
     permission_classes = [IsAuthenticated]
-    
+    pagination_class = TimestampCursorPagination
+
     def get_queryset(self):
-        queryset = Alert.objects.select_related('device')
-        
+        # resolved_by is joined so resolved_by_username never fires a
+        # per-row query; only() trims both rows to the serialized columns
+        queryset = Alert.objects.select_related('device', 'resolved_by').only(
+            'id', 'device', 'alert_type', 'severity', 'message', 'timestamp',
+            'is_resolved', 'resolved_at', 'threshold_value', 'actual_value',
+            'device__name', 'resolved_by__username'
+        )
+
         if not self.request.user.is_staff:
             queryset = queryset.filter(device__owner=self.request.user)
         
@@ -164,48 +245,90 @@ class DashboardStatsView(APIView):
     
     def get(self, request):
         user = request.user
-        
-        # Get user's devices
+
+        cache_key = _dashboard_cache_key(user.id)
+        cached = cache.get(cache_key)
+        if cached is not None:
+            return Response(cached)
+
+        # Get user's devices; the unevaluated pk projection is passed to
+        # every device__in filter below, so the ownership check stays a
+        # server-side semi-join instead of round-tripping ids to Python
         devices = Device.objects.filter(owner=user) if not user.is_staff else Device.objects.all()
-        
-        # Calculate statistics
-        total_devices = devices.count()
-        active_devices = devices.filter(is_active=True).count()
-        
-        # Today's consumption
-        today = timezone.now().date()
-        today_usage = WaterUsage.objects.filter(
-            device__in=devices,
-            timestamp__date=today
-        ).aggregate(total=Sum('total_consumption'))['total'] or 0
-        
-        # This month's consumption
-        month_start = today.replace(day=1)
-        month_usage = WaterUsage.objects.filter(
-            device__in=devices,
-            timestamp__date__gte=month_start
-        ).aggregate(total=Sum('total_consumption'))['total'] or 0
-        
+        device_pks = devices.values_list('pk', flat=True)
+
+        # Device counts in one round-trip via conditional aggregation
+        device_stats = devices.aggregate(
+            total=Count('pk'),
+            active=Count('pk', filter=Q(is_active=True)),
+        )
+        total_devices = device_stats['total']
+        active_devices = device_stats['active']
+
+        # Half-open datetime ranges instead of __date lookups: DATE(timestamp)
+        # casts defeat the (device, timestamp) index, plain bounds don't
+        now = timezone.now()
+        today_start = now.replace(hour=0, minute=0, second=0, microsecond=0)
+        today_end = today_start + timedelta(days=1)
+        month_start = today_start.replace(day=1)
+
+        if connection.vendor == 'postgresql':
+            # Today from the raw rows (fresh, narrow range scan); the
+            # month's earlier days from the wu_daily_rollup materialized
+            # view, whose per-day totals no longer change
+            today_usage = WaterUsage.objects.filter(
+                device__in=device_pks,
+                timestamp__gte=today_start, timestamp__lt=today_end,
+            ).aggregate(total=Sum('total_consumption'))['total'] or 0
+            month_usage = today_usage + self._rollup_total(
+                user, month_start.date(), today_start.date()
+            )
+        else:
+            # Today's and this month's consumption from a single scan,
+            # bounded to the month so the range never widens to the
+            # devices' full reading history
+            usage_stats = WaterUsage.objects.filter(
+                device__in=device_pks,
+                timestamp__gte=month_start,
+            ).aggregate(
+                today=Sum('total_consumption',
+                          filter=Q(timestamp__gte=today_start, timestamp__lt=today_end)),
+                month=Sum('total_consumption'),
+            )
+            today_usage = usage_stats['today'] or 0
+            month_usage = usage_stats['month'] or 0
+
         # Active alerts
         active_alerts = Alert.objects.filter(
-            device__in=devices,
+            device__in=device_pks,
             is_resolved=False
         ).count()
         
         # Monthly cost
-        from django.conf import settings
         monthly_cost = month_usage * settings.WATER_RATE_PER_LITER
         
-        # Latest readings
-        latest_readings = WaterUsage.objects.filter(
-            device__in=devices
-        ).select_related('device').order_by('-timestamp')[:10]
-        
-        # Recent alerts
-        recent_alerts = Alert.objects.filter(
-            device__in=devices
-        ).select_related('device').order_by('-timestamp')[:5]
-        
+        # Latest readings and recent alerts as plain dicts straight from
+        # values(): the payload shape is fixed and read-only, so per-row
+        # DRF serializer machinery buys nothing; the F() aliases keep the
+        # keys the frontend already consumes
+        latest_readings = list(WaterUsage.objects.filter(
+            device__in=device_pks
+        ).values(
+            'id', 'device', 'timestamp', 'flow_rate', 'total_consumption',
+            'pulse_count', 'daily_consumption', 'cost',
+            device_name=F('device__name'),
+            device_location=F('device__location'),
+        ).order_by('-timestamp')[:10])
+
+        recent_alerts = list(Alert.objects.filter(
+            device__in=device_pks
+        ).values(
+            'id', 'device', 'alert_type', 'severity', 'message', 'timestamp',
+            'is_resolved', 'resolved_at', 'threshold_value', 'actual_value',
+            device_name=F('device__name'),
+            resolved_by_username=F('resolved_by__username'),
+        ).order_by('-timestamp')[:5])
+
         data = {
             'total_devices': total_devices,
             'active_devices': active_devices,
@@ -213,39 +336,69 @@ class DashboardStatsView(APIView):
             'total_consumption_month': month_usage,
             'active_alerts': active_alerts,
             'monthly_cost': monthly_cost,
-            'latest_readings': WaterUsageSerializer(latest_readings, many=True).data,
-            'recent_alerts': AlertSerializer(recent_alerts, many=True).data
+            'latest_readings': latest_readings,
+            'recent_alerts': recent_alerts
         }
-        
+
+        cache.set(cache_key, data, DASHBOARD_CACHE_TTL)
         return Response(data)
 
+    @staticmethod
+    def _rollup_total(user, start_day, end_day):
+        """Sum wu_daily_rollup over [start_day, end_day) for the user's devices."""
+        sql = ('SELECT COALESCE(SUM("total"), 0) FROM "wu_daily_rollup" '
+               'WHERE "day" >= %s AND "day" < %s')
+        params = [start_day, end_day]
+        if not user.is_staff:
+            sql += (' AND "device_id" IN (SELECT "id" FROM "water_meter_device" '
+                    'WHERE "owner_id" = %s)')
+            params.append(user.id)
+        with connection.cursor() as cursor:
+            cursor.execute(sql, params)
+            return cursor.fetchone()[0]
+
 
 # Frontend Views
+# These templates take no context beyond the signed-in user (the pages
+# load their data over the API), so the rendered HTML is cached for an
+# hour. vary_on_cookie keys the cache per session, keeping the
+# {{ user.username }} in the navbar correct; login_required stays
+# outermost so the auth check runs before the cache is consulted.
 @login_required
+@cache_page(60 * 60, key_prefix='staticpage')
+@vary_on_cookie
 def dashboard(request):
     """Main dashboard view"""
     return render(request, 'water_meter/dashboard.html')
 
 
 @login_required
+@cache_page(60 * 60, key_prefix='staticpage')
+@vary_on_cookie
 def devices(request):
     """Devices management view"""
     return render(request, 'water_meter/devices.html')
 
 
 @login_required
+@cache_page(60 * 60, key_prefix='staticpage')
+@vary_on_cookie
 def analytics(request):
     """Analytics and charts view"""
     return render(request, 'water_meter/analytics.html')
 
 
 @login_required
+@cache_page(60 * 60, key_prefix='staticpage')
+@vary_on_cookie
 def alerts(request):
     """Alerts management view"""
     return render(request, 'water_meter/alerts.html')
 
 
 @login_required
+@cache_page(60 * 60, key_prefix='staticpage')
+@vary_on_cookie
 def billing(request):
     """Billing and usage reports view"""
     return render(request, 'water_meter/billing.html')
@@ -254,6 +407,5 @@ def billing(request):
 def home(request):
     """Home page view"""
     if request.user.is_authenticated:
-        from django.shortcuts import redirect
         return redirect('dashboard')
     return render(request, 'water_meter/home.html')